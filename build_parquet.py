@@ -0,0 +1,4 @@
+from src.utils.parquet import build_parquet
+
+if __name__ == "__main__":
+    build_parquet()
@@ -1,10 +1,14 @@
-import pandas as pd
 import streamlit as st
 from src.services.streamlit_service import (
+    AREA_NAMES_NO_MEDIA,
+    AREA_OPTIONS,
+    SCORE_COLS_NO_MEDIA,
     generate_ai_summary,
+    generate_ai_summary_batch,
     generate_area_comparison,
     generate_comparison_chart,
     load_data,
+    precompute,
 )
 
 # Configuração inicial da página
@@ -29,19 +33,12 @@ except Exception as e:
     st.error(f"Erro ao carregar dados: {e}")
     st.stop()
 
+stats = precompute(df, df.attrs["data_version"])
+
 # Sidebar com filtros
 st.sidebar.header("⚙️ Configurações Rápidas")
 
 # Controles
-AREA_OPTIONS = {
-    "Média Geral": "NU_NOTA_MEDIA",
-    "Ciências da Natureza": "NU_NOTA_CN",
-    "Ciências Humanas": "NU_NOTA_CH",
-    "Linguagens": "NU_NOTA_LC",
-    "Matemática": "NU_NOTA_MT",
-    "Redação": "NU_NOTA_REDACAO",
-}
-
 selected_area = st.sidebar.selectbox(
     "Área de Análise:", list(AREA_OPTIONS.keys()), index=0
 )
@@ -53,35 +50,132 @@ chart_type = st.sidebar.radio(
 )
 
 
+# Dados pré-agregados para os sumários por IA e a tabela resumida
+summary_data = stats["by_internet"][AREA_OPTIONS[selected_area]]
+
+# Estatísticas de todas as áreas vindas de uma única agregação
+summary_df = (
+    stats["by_internet"][list(SCORE_COLS_NO_MEDIA)]
+    .drop(columns="count", level=1)
+    .stack(level=0, future_stack=True)
+    .rename_axis(["INTERNET", "Área"])
+    .reset_index()
+)
+summary_df["Área"] = summary_df["Área"].map(AREA_NAMES_NO_MEDIA)
+
+comparison_data = summary_df.groupby("Área", observed=True).agg(
+    {"mean": ["max", "min", "mean"], "median": ["max", "min"]}
+)
+
+# Sumários por IA guardados na sessão, para sobreviverem à troca de aba; o
+# sumário principal é indexado pela área e pelo tipo de gráfico que o geraram
+ai_texts = st.session_state.setdefault("ai_texts", {})
+summary_id = (selected_area, chart_type)
+
+# Sumário e análise comparativa gerados juntos em uma única chamada à IA
+if st.sidebar.button("Gerar Ambos os Sumários"):
+    with st.spinner("Gerando sumários com IA..."):
+        ai_texts[summary_id], ai_texts["comparison"] = generate_ai_summary_batch(
+            [
+                (summary_data, selected_area, chart_type),
+                (comparison_data, "Comparação entre Áreas", "Tabela Comparativa"),
+            ]
+        )
+
+
+# Abas controladas por um rádio, para que só a aba ativa seja renderizada
+TABS = ("📊 Análise Principal", "📈 Comparação entre Áreas", "ℹ️ Sobre o Projeto")
+
+
+def mark_tab2_seen():
+    """Marca a aba de comparação entre áreas como já aberta nesta sessão."""
+    if st.session_state["active_tab"] == TABS[1]:
+        st.session_state["tab2_seen"] = True
+
+
+@st.fragment
+def render_area_comparison():
+    """
+    Renderiza a aba de comparação entre áreas. Como fragmento, as interações
+    dentro dela reexecutam apenas esta função, e o gráfico e a tabela só são
+    gerados depois que o usuário abre a aba pela primeira vez.
+    """
+    st.header("Comparação entre Áreas do Conhecimento")
+
+    if st.session_state.get("tab2_seen"):
+        with st.spinner("Gerando comparação entre áreas..."):
+            area_chart = generate_area_comparison(stats, stats["version"])
+            st.plotly_chart(area_chart, use_container_width=True)
+
+        # Tabela resumida otimizada
+        st.subheader("Dados Resumidos por Área")
+
+        # Média e mediana por área lidas direto da agregação pré-calculada
+        area_table = (
+            stats["by_internet"]
+            .loc[:, (SCORE_COLS_NO_MEDIA, ["mean", "median"])]
+            .stack(level=0, future_stack=True)
+            .unstack("INTERNET")
+            .rename(index=AREA_NAMES_NO_MEDIA)
+            .rename_axis("Área")
+        )
+        st.dataframe(area_table, use_container_width=True)
+
+    # Sumário por IA para comparação entre áreas
+    st.subheader("📝 Análise Comparativa (IA Generativa)")
+
+    if st.button("Gerar Análise Comparativa"):
+        with st.spinner("Gerando análise com IA..."):
+            ai_texts["comparison"] = generate_ai_summary(
+                comparison_data, "Comparação entre Áreas", "Tabela Comparativa"
+            )
+
+    ai_comparison = ai_texts.get("comparison")
+    if ai_comparison:
+        st.markdown(f"**Análise Comparativa:**\n\n{ai_comparison}")
+
+        # Texto bruto com botão de cópia nativo do st.code
+        with st.expander("Copiar Análise"):
+            st.code(ai_comparison, language="markdown")
+
+
 # Layout principal
-tab1, tab2, tab3 = st.tabs(
-    ["📊 Análise Principal", "📈 Comparação entre Áreas", "ℹ️ Sobre o Projeto"]
+active_tab = st.radio(
+    "Aba:",
+    TABS,
+    horizontal=True,
+    key="active_tab",
+    on_change=mark_tab2_seen,
+    label_visibility="collapsed",
 )
 
-with tab1:
+if active_tab == TABS[0]:
     st.header(f"Análise de {selected_area}")
 
     # Gráfico principal com loader
     with st.spinner("Gerando visualização..."):
         chart = generate_comparison_chart(
-            df, AREA_OPTIONS[selected_area], chart_type, selected_area
+            stats,
+            AREA_OPTIONS[selected_area],
+            chart_type,
+            selected_area,
+            stats["version"],
         )
         st.plotly_chart(chart, use_container_width=True)
 
     # Métricas rápidas
     st.subheader("Principais Estatísticas")
 
+    # Médias por grupo lidas das agregações pré-calculadas (sem varrer o df)
+    means = stats["by_internet"][(AREA_OPTIONS[selected_area], "mean")]
+
     col1, col2, col3 = st.columns(3)
     with col1:
-        mean_with = df[df["INTERNET"] == "Tem internet em casa"][
-            AREA_OPTIONS[selected_area]
-        ].mean()
+        mean_with = means.get("Tem internet em casa", float("nan"))
         st.metric("Média com Internet", f"{mean_with:.1f}")
 
     with col2:
-        mean_without = df[df["INTERNET"] == "Não tem internet em casa"][
-            AREA_OPTIONS[selected_area]
-        ].mean()
+        mean_without = means.get("Não tem internet em casa", float("nan"))
         st.metric("Média sem Internet", f"{mean_without:.1f}")
 
     with col3:
@@ -91,68 +185,24 @@ with tab1:
     # Seção de sumário por IA
     st.subheader("📝 Sumário Analítico (IA Generativa)")
 
-    # Pré-agrega os dados para o sumário
-    summary_data = df.groupby("INTERNET", observed=True)[
-        AREA_OPTIONS[selected_area]
-    ].describe()
-
     if st.button("Gerar Sumário Automático"):
         with st.spinner("Gerando sumário com IA..."):
-            ai_summary = generate_ai_summary(summary_data, selected_area, chart_type)
-            st.markdown(f"**Sumário:**\n\n{ai_summary}")
-
-            # Opção para copiar o sumário
-            if st.button("Copiar Análise"):
-                st.clipboard(ai_summary)
-
-
-with tab2:
-    st.header("Comparação entre Áreas do Conhecimento")
-
-    with st.spinner("Gerando comparação entre áreas..."):
-        area_chart = generate_area_comparison(df, AREA_OPTIONS)
-        st.plotly_chart(area_chart, use_container_width=True)
-
-    # Tabela resumida otimizada
-    st.subheader("Dados Resumidos por Área")
-
-    summary_data = []
-    for area_name, area_col in AREA_OPTIONS.items():
-        if area_name == "Média Geral":
-            continue
-        group_stats = df.groupby("INTERNET", observed=True)[area_col].agg(
-            ["mean", "median", "std"]
-        )
-        group_stats["Área"] = area_name
-        summary_data.append(group_stats.reset_index())
-
-    summary_df = pd.concat(summary_data)
-    st.dataframe(
-        summary_df.pivot(index="Área", columns="INTERNET", values=["mean", "median"]),
-        use_container_width=True,
-    )
-
-    # Sumário por IA para comparação entre áreas
-    st.subheader("📝 Análise Comparativa (IA Generativa)")
-
-    if st.button("Gerar Análise Comparativa"):
-        with st.spinner("Gerando análise com IA..."):
-            # Pré-agrega dados comparativos
-            comparison_data = summary_df.groupby("Área").agg(
-                {"mean": ["max", "min", "mean"], "median": ["max", "min"]}
+            ai_texts[summary_id] = generate_ai_summary(
+                summary_data, selected_area, chart_type
             )
 
-            ai_comparison = generate_ai_summary(
-                comparison_data, "Comparação entre Áreas", "Tabela Comparativa"
-            )
-            st.markdown(f"**Análise Comparativa:**\n\n{ai_comparison}")
+    ai_summary = ai_texts.get(summary_id)
+    if ai_summary:
+        st.markdown(f"**Sumário:**\n\n{ai_summary}")
 
-            # Opção para copiar a análise
-            if st.button("Copiar Análise"):
-                st.clipboard(ai_comparison)
+        # Texto bruto com botão de cópia nativo do st.code
+        with st.expander("Copiar Análise"):
+            st.code(ai_summary, language="markdown")
 
+elif active_tab == TABS[1]:
+    render_area_comparison()
 
-with tab3:
+else:
     st.header("Sobre o Projeto")
 
     st.markdown(
@@ -6,13 +6,16 @@ def setup_logging():
     Configura o logger para registrar mensagens com n vel de detalhe
     INFO e formato de data e hora "%Y-%m-%d %H:%M:%S".
 
-    Retorna um objeto logger configurado.
+    Retorna um objeto logger configurado. É idempotente: se o logger raiz já
+    tiver handlers (por exemplo, quando o Streamlit recarrega o módulo), não
+    adiciona outros.
     """
-    logging.basicConfig(
-        level=logging.INFO,
-        format="%(asctime)s - %(levelname)s - %(message)s",
-        datefmt="%Y-%m-%d %H:%M:%S",
-    )
+    if not logging.getLogger().hasHandlers():
+        logging.basicConfig(
+            level=logging.INFO,
+            format="%(asctime)s - %(levelname)s - %(message)s",
+            datefmt="%Y-%m-%d %H:%M:%S",
+        )
 
     logger = logging.getLogger(__name__)
     return logger
@@ -1,3 +1,9 @@
+import hashlib
+import logging
+import os
+import re
+
+import numpy as np
 import pandas as pd
 import plotly.express as px
 import plotly.graph_objects as go
@@ -6,128 +12,424 @@ from plotly.subplots import make_subplots
 
 from src.config.logger import logger
 from src.services.openai_service import get_response
-from src.utils.prompt import generate_prompt
+from src.utils.group_stats import group_mean_std
+from src.utils.parquet import PARQUET_PATH, build_parquet, parquet_is_stale
+from src.utils.prompt import generate_batch_prompt
+
+# Áreas do conhecimento e respectivas colunas de nota
+AREA_OPTIONS = {
+    "Média Geral": "NU_NOTA_MEDIA",
+    "Ciências da Natureza": "NU_NOTA_CN",
+    "Ciências Humanas": "NU_NOTA_CH",
+    "Linguagens": "NU_NOTA_LC",
+    "Matemática": "NU_NOTA_MT",
+    "Redação": "NU_NOTA_REDACAO",
+}
+
+# Respostas delimitadas no formato pedido pelo prompt em lote
+# (tolera id entre aspas e espaços extras, como é comum em respostas da IA)
+ANSWER_PATTERN = re.compile(
+    r"<answer\s+id\s*=\s*[\"']?(\d+)[\"']?\s*>(.*?)</answer\s*>", re.DOTALL
+)
+ANSWER_TAG_PATTERN = re.compile(r"</?answer\b[^>]*>")
+
+# Áreas individuais (sem a média geral), resolvidas uma única vez
+AREA_OPTIONS_NO_MEDIA = {k: v for k, v in AREA_OPTIONS.items() if k != "Média Geral"}
+SCORE_COLS_NO_MEDIA = tuple(AREA_OPTIONS_NO_MEDIA.values())
+
+# Nome da área de cada coluna individual de nota
+AREA_NAMES_NO_MEDIA = {col: area for area, col in AREA_OPTIONS_NO_MEDIA.items()}
+
+# Colunas de nota de todas as opções de área
+SCORE_COLS = list(AREA_OPTIONS.values())
+
+# Colunas efetivamente utilizadas pelo dashboard
+USED_COLS = frozenset([*SCORE_COLS, "INTERNET", "RENDA_SIMPLIFICADA"])
+
+# Validade (em segundos) dos dados carregados do Parquet
+DATA_TTL = 3600
 
 
 # Carregar dados
-@st.cache_data(ttl=3600, show_spinner=False)
+@st.cache_resource(ttl=DATA_TTL, show_spinner=False)
 def load_data():
     """
-    Loads the ENEM 2023 data from a CSV file, optimizes data types by converting
-    object columns to category, and caches the result for 3600 seconds.
+    Loads only the columns used by the dashboard from the ENEM 2023 Parquet
+    file (generated by `build_parquet.py`, or rebuilt from the treated CSV
+    when it is missing or older than the CSV), whose category dtypes are
+    preserved on disk, drops unused categories from the grouping columns, and
+    caches the result for 3600 seconds. The DataFrame is cached as a shared
+    resource, so every rerun and session reads the same in-memory instance
+    instead of unpickling a fresh copy; it must be treated as read-only. Its
+    `attrs["data_version"]` holds the Parquet mtime and row count, used to key
+    the caches derived from it.
 
     Returns:
-        pd.DataFrame: The loaded and optimized data.
+        pd.DataFrame: The loaded data.
     """
 
-    df = pd.read_csv("./data/output/enem_2023_tratado.csv")
+    if parquet_is_stale():
+        logger.info("Arquivo Parquet ausente ou desatualizado; gerando do CSV.")
+        build_parquet()
+
+    mtime = os.path.getmtime(PARQUET_PATH)
+    df = pd.read_parquet(PARQUET_PATH, columns=sorted(USED_COLS))
+    df.attrs["data_version"] = (mtime, len(df))
 
-    # Otimização de tipos de dados
-    for col in df.select_dtypes(include=["object"]):
-        df[col] = df[col].astype("category")
+    # Remove categorias sem ocorrências para manter os groupbys enxutos
+    for col in ("INTERNET", "RENDA_SIMPLIFICADA"):
+        df[col] = df[col].cat.remove_unused_categories()
+
+    n_renda = len(df["RENDA_SIMPLIFICADA"].cat.categories)
+    logger.info("Categorias de renda carregadas: %d", n_renda)
 
     return df
 
 
+# Pré-agregações
+def soa_bundle(_df):
+    """
+    Extrai os códigos das categorias e as notas como arrays numpy contíguos,
+    para que as reduções numéricas não passem pelo pandas. Não é armazenado em
+    cache: a matriz de notas é uma cópia e é liberada assim que ``precompute``
+    termina.
+
+    Parameters
+    ----------
+    _df : pd.DataFrame
+        DataFrame com os dados do ENEM.
+
+    Returns
+    -------
+    dict
+        Dicionário com as chaves ``codes_internet`` e ``codes_renda`` (códigos
+        das categorias), ``cats_internet`` e ``cats_renda`` (rótulos das
+        categorias, na ordem dos códigos), ``score_matrix`` (matriz float32
+        com uma coluna contígua por nota, na ordem de ``SCORE_COLS``) e
+        ``scores`` (cada coluna da matriz, sem cópia).
+    """
+    score_matrix = np.empty((len(_df), len(SCORE_COLS)), dtype=np.float32, order="F")
+    for j, col in enumerate(SCORE_COLS):
+        score_matrix[:, j] = _df[col].to_numpy()
+
+    return {
+        "codes_internet": _df["INTERNET"].cat.codes.to_numpy(),
+        "codes_renda": _df["RENDA_SIMPLIFICADA"].cat.codes.to_numpy(),
+        "cats_internet": _df["INTERNET"].cat.categories.to_numpy(),
+        "cats_renda": _df["RENDA_SIMPLIFICADA"].cat.categories.to_numpy(),
+        "score_matrix": score_matrix,
+        "scores": {col: score_matrix[:, j] for j, col in enumerate(SCORE_COLS)},
+    }
+
+
+def _box_stats(soa):
+    """
+    Calcula quartis e bigodes das notas de cada área por acesso à internet.
+
+    Os bigodes vão até o último valor dentro de 1.5 * IQR, como no Plotly.
+
+    Parameters
+    ----------
+    soa : dict
+        Arrays extraídos por ``soa_bundle``.
+
+    Returns
+    -------
+    pd.DataFrame
+        Colunas ``q1``, ``median``, ``q3``, ``lowerfence`` e ``upperfence``,
+        indexadas por (coluna da área, INTERNET).
+    """
+    codes = soa["codes_internet"]
+    groups = [codes == k for k in range(len(soa["cats_internet"]))]
+    rows = {}
+    for area_col, vals in soa["scores"].items():
+        valid = ~np.isnan(vals)
+        for category, in_group in zip(soa["cats_internet"], groups):
+            group = vals[valid & in_group]
+            if not group.size:
+                continue
+            q1, median, q3 = np.quantile(group, [0.25, 0.5, 0.75])
+            iqr = q3 - q1
+            rows[(area_col, category)] = {
+                "q1": q1,
+                "median": median,
+                "q3": q3,
+                "lowerfence": group[group >= q1 - 1.5 * iqr].min(),
+                "upperfence": group[group <= q3 + 1.5 * iqr].max(),
+            }
+
+    return pd.DataFrame.from_dict(rows, orient="index")
+
+
+def _histograms(soa, bins=30):
+    """
+    Calcula o histograma percentual das notas de cada área por acesso à internet,
+    com faixas comuns aos grupos.
+
+    Parameters
+    ----------
+    soa : dict
+        Arrays extraídos por ``soa_bundle``.
+    bins : int
+        Número de faixas do histograma.
+
+    Returns
+    -------
+    dict
+        Para cada coluna de área, um DataFrame indexado pelo ponto médio das
+        faixas, com o percentual de cada grupo de INTERNET em uma coluna.
+    """
+    codes = soa["codes_internet"]
+    groups = [codes == k for k in range(len(soa["cats_internet"]))]
+    histograms = {}
+    for area_col, vals in soa["scores"].items():
+        valid = ~np.isnan(vals)
+        edges = np.linspace(vals[valid].min(), vals[valid].max(), bins + 1)
+
+        percents = {}
+        for category, in_group in zip(soa["cats_internet"], groups):
+            counts, _ = np.histogram(vals[valid & in_group], bins=edges)
+            if counts.sum():
+                percents[category] = 100 * counts / counts.sum()
+
+        histograms[area_col] = pd.DataFrame(
+            percents, index=(edges[:-1] + edges[1:]) / 2
+        )
+
+    return histograms
+
+
+def _by_internet(soa, box):
+    """
+    Monta a tabela de média, mediana, desvio padrão e contagem de cada área por
+    acesso à internet. Média, desvio e contagem saem de uma única passada de
+    ``group_mean_std`` sobre a matriz de notas; a mediana vem de ``box``.
+
+    Parameters
+    ----------
+    soa : dict
+        Arrays extraídos por ``soa_bundle``.
+    box : pd.DataFrame
+        Quartis calculados por ``_box_stats``.
+
+    Returns
+    -------
+    pd.DataFrame
+        Indexado por INTERNET, com colunas (coluna da área, estatística).
+    """
+    cats = soa["cats_internet"]
+    mean, std, count = group_mean_std(
+        soa["codes_internet"], soa["score_matrix"], len(cats)
+    )
+    median = box["median"].unstack().reindex(index=SCORE_COLS, columns=cats).T
+
+    by_internet = pd.DataFrame(
+        np.stack([mean, median.to_numpy(), std, count], axis=2).reshape(len(cats), -1),
+        index=pd.Index(cats, name="INTERNET"),
+        columns=pd.MultiIndex.from_product(
+            [SCORE_COLS, ["mean", "median", "std", "count"]]
+        ),
+    )
+    return by_internet.astype({(col, "count"): "int64" for col in SCORE_COLS})
+
+
+def _by_renda_internet(soa):
+    """
+    Monta a tabela de média de cada área por renda e acesso à internet, com
+    uma única passada de ``group_mean_std`` sobre a matriz de notas usando um
+    código combinado por par (renda, internet).
+
+    Parameters
+    ----------
+    soa : dict
+        Arrays extraídos por ``soa_bundle``.
+
+    Returns
+    -------
+    pd.DataFrame
+        Indexado por (RENDA_SIMPLIFICADA, INTERNET), apenas com os pares
+        observados, e com uma coluna por área.
+    """
+    cats_renda, cats_internet = soa["cats_renda"], soa["cats_internet"]
+    codes_renda = soa["codes_renda"].astype(np.intp)
+    codes_internet = soa["codes_internet"].astype(np.intp)
+    n_internet = len(cats_internet)
+    k_groups = len(cats_renda) * n_internet
+
+    # Par (renda, internet) -> código único; -1 se qualquer um estiver ausente
+    codes = np.where(
+        (codes_renda >= 0) & (codes_internet >= 0),
+        codes_renda * n_internet + codes_internet,
+        -1,
+    )
+    mean, _, _ = group_mean_std(codes, soa["score_matrix"], k_groups)
+    observed = np.bincount(codes[codes >= 0], minlength=k_groups) > 0
+
+    pairs = np.flatnonzero(observed)
+    index = pd.MultiIndex.from_arrays(
+        [
+            pd.Categorical.from_codes(pairs // n_internet, categories=cats_renda),
+            pd.Categorical.from_codes(pairs % n_internet, categories=cats_internet),
+        ],
+        names=["RENDA_SIMPLIFICADA", "INTERNET"],
+    )
+    return pd.DataFrame(mean[observed], index=index, columns=SCORE_COLS)
+
+
+@st.cache_resource(max_entries=1, show_spinner=False)
+def precompute(_df, data_version):
+    """
+    Calcula, uma única vez por versão dos dados, as estatísticas agregadas de
+    todas as áreas do conhecimento usadas pelo dashboard, de modo que as
+    interações com os widgets se tornem consultas a tabelas pequenas.
+
+    Parameters
+    ----------
+    _df : pd.DataFrame
+        DataFrame com os dados do ENEM (não entra no hash do cache).
+    data_version : tuple
+        Versão dos dados (``df.attrs["data_version"]``), que indexa o cache.
+
+    Returns
+    -------
+    dict
+        Dicionário com as chaves ``by_internet`` (média, mediana, desvio padrão
+        e contagem por acesso à internet) e ``by_renda_internet`` (média por
+        renda e acesso à internet), ambas com uma coluna (ou nível de coluna)
+        por área, além de ``box`` (quartis e bigodes), ``hist`` (histogramas
+        percentuais) de cada área e ``version`` (a própria ``data_version``).
+    """
+    soa = soa_bundle(_df)
+    box = _box_stats(soa)
+
+    return {
+        "by_internet": _by_internet(soa, box),
+        "by_renda_internet": _by_renda_internet(soa),
+        "box": box,
+        "hist": _histograms(soa),
+        "version": data_version,
+    }
+
+
 # Funções de visualização
+def _build_box(stats, area_col, selected_area):
+    """Boxplot a partir dos quartis pré-calculados (cinco números por grupo)."""
+    fig = go.Figure()
+    for category, box in stats["box"].loc[area_col].iterrows():
+        fig.add_trace(
+            go.Box(
+                x=[category],
+                name=category,
+                q1=[box["q1"]],
+                median=[box["median"]],
+                q3=[box["q3"]],
+                lowerfence=[box["lowerfence"]],
+                upperfence=[box["upperfence"]],
+            )
+        )
+    fig.update_layout(
+        showlegend=False,
+        title=f"Distribuição de {selected_area}",
+        xaxis_title="INTERNET",
+        yaxis_title=area_col,
+    )
+    return fig
+
+
+def _build_hist(stats, area_col, selected_area):
+    """Histograma a partir dos percentuais por faixa pré-calculados."""
+    hist = stats["hist"][area_col]
+    fig = go.Figure(
+        [
+            go.Bar(x=hist.index, y=hist[category], name=category, opacity=0.7)
+            for category in hist.columns
+        ]
+    )
+    fig.update_layout(
+        barmode="overlay",
+        bargap=0,
+        title=f"Distribuição Percentual de {selected_area}",
+        xaxis_title=area_col,
+        yaxis_title="percent",
+        legend_title_text="INTERNET",
+    )
+    return fig
+
+
+def _build_bar(stats, area_col, selected_area):
+    """Barras com as médias pré-calculadas por renda e acesso à internet."""
+    agg_df = stats["by_renda_internet"][area_col].reset_index()
+    return px.bar(
+        agg_df,
+        x="RENDA_SIMPLIFICADA",
+        y=area_col,
+        color="INTERNET",
+        barmode="group",
+        title=f"Médias de {selected_area} por Renda e Internet",
+    )
+
+
+_BUILDERS = {
+    "Boxplot Simplificado": _build_box,
+    "Histograma Agregado": _build_hist,
+    "Médias Comparadas": _build_bar,
+}
+
+_MARGIN = dict(l=20, r=20, t=40, b=20)
+
+
 @st.cache_data(ttl=600)
-def generate_comparison_chart(_df, area_col, chart_type, selected_area):
+def generate_comparison_chart(
+    _stats, area_col, chart_type, selected_area, data_version
+):
     """
     Gera um gráfico comparativo para uma coluna específica do ENEM.
 
     Parameters
     ----------
-    _df : pd.DataFrame
-        DataFrame com os dados do ENEM.
+    _stats : dict
+        Estatísticas pré-calculadas por ``precompute``.
     area_col : str
         Nome da coluna a ser analisada.
     chart_type : str
         Tipo de gráfico a ser gerado.
     selected_area : str
         Nome da área do conhecimento analisada.
+    data_version : tuple
+        Versão dos dados de ``_stats`` (``_stats["version"]``), que indexa o
+        cache.
 
     Returns
     -------
     fig : plotly.graph_objs.Figure
         Gráfico comparativo gerado.
     """
-    if chart_type == "Boxplot Simplificado":
-        # Amostra para melhor performance
-        sample_df = _df.sample(min(5000, len(_df)), random_state=42)
-        fig = px.box(
-            sample_df,
-            x="INTERNET",
-            y=area_col,
-            color="INTERNET",
-            points=None,  # Remove pontos individuais para performance
-            title=f"Distribuição de {selected_area}",
-        )
-        fig.update_layout(showlegend=False)
-
-    elif chart_type == "Histograma Agregado":
-        fig = px.histogram(
-            _df,
-            x=area_col,
-            color="INTERNET",
-            barmode="overlay",
-            opacity=0.7,
-            nbins=30,  # Menos bins para performance
-            histnorm="percent",  # Normalizado para melhor comparação
-            title=f"Distribuição Percentual de {selected_area}",
-        )
-
-    else:  # Médias Comparadas
-        agg_df = (
-            _df.groupby(["RENDA_SIMPLIFICADA", "INTERNET"], observed=True)[area_col]
-            .mean()
-            .reset_index()
-        )
-        fig = px.bar(
-            agg_df,
-            x="RENDA_SIMPLIFICADA",
-            y=area_col,
-            color="INTERNET",
-            barmode="group",
-            title=f"Médias de {selected_area} por Renda e Internet",
-        )
-
-    fig.update_layout(margin=dict(l=20, r=20, t=40, b=20))
+    fig = _BUILDERS[chart_type](_stats, area_col, selected_area)
+    fig.update_layout(margin=_MARGIN)
     return fig
 
 
 @st.cache_data(ttl=600)
-def generate_area_comparison(_df, area_options):
+def generate_area_comparison(_stats, data_version):
     """
     Gera um gráfico comparativo entre as diferentes áreas do conhecimento, mostrando
-    a média e o percentil 50% das notas em cada área para os alunos com e sem acesso
-    à internet em casa.
+    a média das notas em cada área para os alunos com e sem acesso à internet em
+    casa.
 
     Parameters
     ----------
-    _df : pd.DataFrame
-        DataFrame com os dados do ENEM.
-    area_options : dict
-        Dicionário com as áreas do conhecimento como chaves e os respectivos nomes
-        das colunas como valores.
+    _stats : dict
+        Estatísticas pré-calculadas por ``precompute``.
+    data_version : tuple
+        Versão dos dados de ``_stats`` (``_stats["version"]``), que indexa o
+        cache.
 
     Returns
     -------
     fig : plotly.graph_objs.Figure
         Gráfico comparativo gerado.
     """
-
-    # Pré-agregação para performance
-    area_stats = []
-    for area_name, area_col in area_options.items():
-        if area_name == "Média Geral":
-            continue
-        stats = _df.groupby("INTERNET", observed=True)[area_col].describe()[
-            ["mean", "50%"]
-        ]
-        stats["Área"] = area_name
-        area_stats.append(stats.reset_index())
-
-    stats_df = pd.concat(area_stats)
+    by_internet = _stats["by_internet"]
 
     fig = make_subplots(
         rows=2,
@@ -147,11 +449,16 @@ def generate_area_comparison(_df, area_options):
         row = (i // 2) + 1
         col = (i % 2) + 1
 
-        area_df = stats_df[stats_df["Área"] == area]
+        # Médias por grupo já calculadas em precompute (ignora grupos vazios)
+        area_stats = by_internet[AREA_OPTIONS[area]]
+        area_stats = area_stats[area_stats["count"] > 0]
 
         fig.add_trace(
             go.Bar(
-                x=area_df["INTERNET"], y=area_df["mean"], name=area, showlegend=False
+                x=area_stats.index,
+                y=area_stats["mean"],
+                name=area,
+                showlegend=False,
             ),
             row=row,
             col=col,
@@ -162,7 +469,6 @@ def generate_area_comparison(_df, area_options):
 
 
 # Função para gerar sumário com IA
-@st.cache_data(ttl=3600)
 def generate_ai_summary(data_summary, selected_area, chart_type):
     """
     Gera um sumário automático baseado em uma análise de dados do ENEM.
@@ -181,17 +487,101 @@ def generate_ai_summary(data_summary, selected_area, chart_type):
     str
         Sumário gerado pela IA.
     """
+    return generate_ai_summary_batch([(data_summary, selected_area, chart_type)])[0]
+
+
+def summary_key(summaries):
+    """
+    Calcula uma chave curta a partir do conteúdo dos resumos estatísticos, de modo
+    que resumos com os mesmos valores compartilhem a mesma entrada de cache.
+
+    Parameters
+    ----------
+    summaries : list of tuple
+        Lista de tuplas ``(data_summary, selected_area, chart_type)``.
+
+    Returns
+    -------
+    str
+        Digest hexadecimal de 32 caracteres.
+    """
+    digest = hashlib.blake2b(digest_size=16)
+    for data_summary, selected_area, chart_type in summaries:
+        values = pd.util.hash_pandas_object(data_summary, index=True).to_numpy()
+        labels = f"{list(data_summary.columns)}|{selected_area}|{chart_type}"
+        digest.update(values.tobytes())
+        digest.update(labels.encode())
+    return digest.hexdigest()
+
+
+@st.cache_data(ttl=3600, show_spinner=False)
+def get_cached_answers(key, prompt, n_answers):
+    """
+    Obtém e separa as respostas da IA para um prompt em lote. Só respostas
+    completas são armazenadas em cache: se faltar alguma resposta, levanta
+    ``ValueError``, que o Streamlit não guarda, e uma nova tentativa chama a IA
+    de novo.
+
+    Parameters
+    ----------
+    key : str
+        Chave do conteúdo que originou o prompt (ver ``summary_key``).
+    prompt : str
+        Prompt enviado à IA (também entra no hash do cache).
+    n_answers : int
+        Número de perguntas do prompt.
+
+    Returns
+    -------
+    list of str
+        Respostas geradas pela IA, na ordem dos ids das perguntas.
+    """
+    response = get_response(prompt)
+    if logger.isEnabledFor(logging.DEBUG):
+        logger.debug("Resposta da IA: %s", response)
+
+    answers = {
+        int(answer_id): answer.strip()
+        for answer_id, answer in ANSWER_PATTERN.findall(response)
+    }
+    # Com uma única pergunta, aceita a resposta fora do formato pedido
+    if not answers and n_answers == 1:
+        answers = {1: ANSWER_TAG_PATTERN.sub("", response).strip()}
+
+    missing = [i for i in range(1, n_answers + 1) if i not in answers]
+    if missing:
+        logger.warning("Resposta da IA sem os sumários de id %s.", missing)
+        raise ValueError(f"resposta da IA sem os sumários de id {missing}")
+
+    return [answers[i] for i in range(1, n_answers + 1)]
+
+
+def generate_ai_summary_batch(summaries):
+    """
+    Gera os sumários automáticos de várias análises de dados do ENEM em uma única
+    chamada à IA.
+
+    Parameters
+    ----------
+    summaries : list of tuple
+        Lista de tuplas ``(data_summary, selected_area, chart_type)``.
+
+    Returns
+    -------
+    list of str
+        Sumários gerados pela IA, na mesma ordem de ``summaries``.
+    """
+    fallback = "Não foi possível gerar o sumário automático."
     try:
-        prompt = generate_prompt(data_summary, selected_area, chart_type)
+        prompt = generate_batch_prompt(summaries)
         logger.info("Prompt gerado com sucesso.")
-        logger.debug(f"Prompt gerado: {prompt}")
+        if logger.isEnabledFor(logging.DEBUG):
+            logger.debug("Prompt gerado: %s", prompt)
 
-        response = get_response(prompt)
+        answers = get_cached_answers(summary_key(summaries), prompt, len(summaries))
         logger.info("Sumário gerado com sucesso.")
-        logger.debug(f"Sumário gerado: {response}")
-
-        return response
+        return answers
     except Exception as e:
-        logger.error(f"Erro ao gerar sumário: {e}")
+        logger.error("Erro ao gerar sumário: %s", e)
         st.error(f"Erro ao gerar sumário: {e}")
-        return "Não foi possível gerar o sumário automático."
+        return [fallback] * len(summaries)
@@ -0,0 +1,46 @@
+import numpy as np
+
+
+def _group_sums(codes, X, k_groups):
+    """
+    Soma, soma dos quadrados e contagem das colunas de X por grupo, com
+    np.bincount por coluna, ignorando códigos negativos e valores NaN.
+    """
+    S = np.zeros((k_groups, X.shape[1]))
+    Q = np.zeros((k_groups, X.shape[1]))
+    N = np.zeros((k_groups, X.shape[1]))
+    for j in range(X.shape[1]):
+        x = X[:, j]
+        valid = (codes >= 0) & ~np.isnan(x)
+        c = codes[valid]
+        v = x[valid].astype(np.float64)
+        S[:, j] = np.bincount(c, weights=v, minlength=k_groups)
+        Q[:, j] = np.bincount(c, weights=v * v, minlength=k_groups)
+        N[:, j] = np.bincount(c, minlength=k_groups)
+    return S, Q, N
+
+
+def group_mean_std(codes, X, k_groups):
+    """
+    Calcula média, desvio padrão amostral e contagem de cada coluna de X por
+    grupo, acumulando em float64.
+
+    Parameters
+    ----------
+    codes : numpy.ndarray
+        Código do grupo de cada linha (negativo para ausente).
+    X : numpy.ndarray
+        Matriz (linhas x colunas) de valores; NaN é ignorado.
+    k_groups : int
+        Número de grupos.
+
+    Returns
+    -------
+    tuple of numpy.ndarray
+        Matrizes (grupos x colunas) de média, desvio padrão e contagem.
+    """
+    S, Q, N = _group_sums(codes, X, k_groups)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        mean = S / N
+        var = (Q - S * mean) / (N - 1)
+    return mean, np.sqrt(np.maximum(var, 0)), N
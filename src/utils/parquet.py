@@ -0,0 +1,60 @@
+import os
+
+import numpy as np
+import pandas as pd
+
+from src.config.logger import logger
+
+CSV_PATH = "./data/output/enem_2023_tratado.csv"
+PARQUET_PATH = "./data/output/enem_2023_tratado.parquet"
+
+
+def build_parquet(csv_path=CSV_PATH, parquet_path=PARQUET_PATH):
+    """
+    Converte o CSV tratado do ENEM 2023 para Parquet, convertendo as colunas
+    de texto para category e as notas para float32. Deve ser executado uma
+    única vez, sempre que o CSV tratado for regerado.
+
+    Parameters
+    ----------
+    csv_path : str
+        Caminho do CSV tratado.
+    parquet_path : str
+        Caminho do arquivo Parquet gerado.
+    """
+    df = pd.read_csv(csv_path)
+
+    # Otimização de tipos de dados (preservada nativamente pelo Parquet)
+    for col in df.select_dtypes(include=["object"]):
+        df[col] = df[col].astype("category")
+
+    # Notas vão de 0 a 1000 com uma casa decimal: float32 basta
+    score_cols = [col for col in df.columns if col.startswith("NU_NOTA_")]
+    df[score_cols] = df[score_cols].astype(np.float32)
+
+    df.to_parquet(parquet_path, engine="pyarrow", compression="zstd", index=False)
+    logger.info("Arquivo Parquet gerado em %s.", parquet_path)
+
+
+def parquet_is_stale(csv_path=CSV_PATH, parquet_path=PARQUET_PATH):
+    """
+    Indica se o Parquet precisa ser (re)gerado: quando ainda não existe ou
+    quando o CSV tratado foi modificado depois dele.
+
+    Parameters
+    ----------
+    csv_path : str
+        Caminho do CSV tratado.
+    parquet_path : str
+        Caminho do arquivo Parquet.
+
+    Returns
+    -------
+    bool
+        True se o Parquet estiver ausente ou desatualizado.
+    """
+    if not os.path.exists(parquet_path):
+        return True
+    return os.path.exists(csv_path) and (
+        os.path.getmtime(csv_path) > os.path.getmtime(parquet_path)
+    )
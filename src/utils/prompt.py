@@ -1,7 +1,50 @@
+import pandas as pd
+
+# Estatísticas do describe() que não são usadas pelo sumário
+DROPPED_STATS = ["min", "25%", "75%", "max"]
+
+# Limite de células da tabela enviada no prompt
+MAX_SUMMARY_CELLS = 60
+
+
+def format_data_summary(data_summary) -> str:
+    """
+    Formata um resumo estatístico como CSV compacto para o prompt, mantendo só as
+    estatísticas usadas pelo sumário, arredondadas para uma casa decimal.
+
+    Se a tabela passar de ``MAX_SUMMARY_CELLS`` células, mantém apenas as linhas
+    com maior diferença de média entre os grupos.
+
+    Parameters
+    ----------
+    data_summary : pandas.DataFrame
+        Resumo estatístico dos dados em forma de DataFrame.
+
+    Returns
+    -------
+    str
+        Tabela em formato CSV.
+    """
+    compact = data_summary.drop(columns=DROPPED_STATS, errors="ignore").round(1)
+
+    if compact.size > MAX_SUMMARY_CELLS:
+        n_rows = max(1, MAX_SUMMARY_CELLS // compact.shape[1])
+        means = compact.get("mean")
+        if isinstance(means, pd.DataFrame):
+            spread = means.max(axis=1) - means.min(axis=1)
+            compact = compact.loc[spread.sort_values(ascending=False).index[:n_rows]]
+        else:
+            compact = compact.head(n_rows)
+
+    return compact.to_csv()
+
+
 def generate_prompt(data_summary, selected_area, chart_type) -> str:
     """
     Gera um texto de prompt para uma tarefa de redação sobre análise de dados do ENEM.
 
+    Equivale a um prompt em lote com uma única pergunta.
+
     Parameters
     ----------
     data_summary : pandas.DataFrame
@@ -16,18 +59,49 @@ def generate_prompt(data_summary, selected_area, chart_type) -> str:
     str
         Texto de prompt para a tarefa de redação.
     """
-    return f"""
-        Você é um analista educacional especializado no ENEM. 
-        Gere um sumário conciso (máximo 150 palavras) em português sobre os seguintes dados:
-        
+    return generate_batch_prompt([(data_summary, selected_area, chart_type)])
+
+
+def generate_batch_prompt(summaries) -> str:
+    """
+    Gera um único texto de prompt para várias análises de dados do ENEM, com as
+    instruções compartilhadas enviadas uma só vez e cada análise delimitada por
+    ``<question id=N>``. A resposta de cada uma deve vir em ``<answer id=N>``.
+
+    Parameters
+    ----------
+    summaries : list of tuple
+        Lista de tuplas ``(data_summary, selected_area, chart_type)``.
+
+    Returns
+    -------
+    str
+        Texto de prompt para as tarefas de redação.
+    """
+    questions = "\n".join(
+        f"""
+        <question id={i}>
         Área analisada: {selected_area}
         Tipo de visualização: {chart_type}
-        
-        Dados estatísticos:
-        {data_summary.to_string()}
-        
+
+        Dados estatísticos (CSV):
+        {format_data_summary(data_summary)}
+        </question>"""
+        for i, (data_summary, selected_area, chart_type) in enumerate(
+            summaries, start=1
+        )
+    )
+
+    return f"""
+        Você é um analista educacional especializado no ENEM.
+        Para cada pergunta abaixo, gere um sumário conciso (máximo 150 palavras) em português sobre os dados.
+
         Inclua:
         1. Principais insights
         2. Diferenças notáveis entre grupos
         3. Possíveis implicações educacionais
+        {questions}
+
+        Responda cada pergunta separadamente, no formato <answer id=N>sumário</answer>,
+        usando o mesmo id da pergunta correspondente.
     """